@@ -37,6 +37,12 @@ never hard‑code secrets into your repository:
 * ``NOTION_VERSION`` – optional.  If unset, the default version
   ``2022-06-28`` will be used.  You can upgrade to a newer version by
   setting this variable.
+* ``UPLOAD_DEADLINE_S`` – optional.  The total number of seconds an upload
+  may spend calling Notion before the service gives up with a 504.
+  Defaults to ``10``.
+* ``NOTION_MAX_INFLIGHT`` – optional.  The maximum number of uploads that
+  may call Notion at the same time; further uploads are refused with a 503.
+  Defaults to ``16``.
 
 Deploying on Railway
 --------------------
@@ -47,7 +53,8 @@ Deploying on Railway
    above with your own values.
 3. Railway automatically installs dependencies from a ``requirements.txt``
    file.  Make sure to include ``fastapi`` and ``uvicorn[standard]`` along
-   with ``python‑multipart`` and ``requests`` in your requirements.
+   with ``python‑multipart``, ``httpx[http2]``, ``tenacity`` and ``orjson``
+   in your requirements.
 4. Set the command for the Railway service to something like::
 
        uvicorn notion_backend_service:app --host 0.0.0.0 --port 8000
@@ -56,14 +63,28 @@ Deploying on Railway
 
 Once deployed, your iOS Shortcut can send a ``POST`` request to
 ``<your‑railway‑subdomain>.railway.app/upload-photo`` with the form
-fields described below.
+fields described below.  ``GET /healthz`` returns 200 once the service is
+ready, or 503 with a description of the problem if the environment
+variables above are missing.
 """
 
+import asyncio
+import math
 import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, IO
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
-import requests
-
-app = FastAPI(title="Notion Upload Service")
+import httpx
+import orjson
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    retry_if_exception_type,
+    retry_if_result,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 # Read environment variables for credentials.  Do not hard‑code your
 # integration token or database ID; set them in the Railway environment.
@@ -72,33 +93,282 @@ DATABASE_ID: str | None = os.getenv("NOTION_DATABASE_ID")
 # Use a default Notion version if one isn't supplied.  You can set
 # NOTION_VERSION in Railway if you want to upgrade to a newer API version.
 NOTION_VERSION: str = os.getenv("NOTION_VERSION", "2022-06-28")
+# Total time, in seconds, an upload may spend talking to Notion before the
+# client is answered with a 504.
+UPLOAD_DEADLINE_S: float = float(os.getenv("UPLOAD_DEADLINE_S", "10"))
+# Each call's httpx timeout stops this many seconds short of the deadline, so
+# a hung Notion call fails with httpx's timeout (which the circuit breaker
+# counts) rather than being cancelled by the deadline itself.
+DEADLINE_MARGIN_S = 0.1
+# Maximum number of uploads talking to Notion at once, and how long, in
+# seconds, an upload may wait for a free slot before being refused.
+NOTION_MAX_INFLIGHT: int = int(os.getenv("NOTION_MAX_INFLIGHT", "16"))
+NOTION_QUEUE_TIMEOUT_S = 0.5
 
-if not NOTION_TOKEN:
-    raise RuntimeError(
-        "NOTION_TOKEN environment variable must be set.  In Railway, add it "
-        "under Project > Variables.  It should contain your Notion integration "
-        "token."
-    )
-if not DATABASE_ID:
-    raise RuntimeError(
-        "NOTION_DATABASE_ID environment variable must be set.  This is the "
-        "32‑character ID from your database URL."
-    )
+# orjson only encodes integers that fit in 64 bits, so numeric form fields
+# are bounded to this range and anything larger is rejected with a 422
+# before any call to Notion is made.
+JSON_INT_MIN = -(2**63)
+JSON_INT_MAX = 2**64 - 1
 
 
-def notion_headers(additional: dict | None = None) -> dict:
-    """Construct the base headers for requests to the Notion API.
+def config_error() -> str | None:
+    """Describe what is wrong with the configuration, or return ``None``.
 
-    Always include the Authorization and Notion‑Version headers.  The
-    Content‑Type header will be set by the caller when appropriate.
+    This is checked when the application starts rather than at import time,
+    so a misconfigured deployment still comes up and reports the problem
+    through ``/healthz`` instead of crash-looping.
     """
-    headers = {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": NOTION_VERSION,
-    }
-    if additional:
-        headers.update(additional)
-    return headers
+    if not NOTION_TOKEN:
+        return (
+            "NOTION_TOKEN environment variable must be set.  In Railway, add it "
+            "under Project > Variables.  It should contain your Notion integration "
+            "token."
+        )
+    if not DATABASE_ID:
+        return (
+            "NOTION_DATABASE_ID environment variable must be set.  This is the "
+            "32‑character ID from your database URL."
+        )
+    return None
+
+
+# Headers sent with every Notion request, built once at import time.
+HEADERS_AUTH: dict[str, str] = {
+    "Authorization": f"Bearer {NOTION_TOKEN}",
+    "Notion-Version": NOTION_VERSION,
+}
+# Extra header for requests whose body is pre-serialised JSON.  Request
+# bodies are encoded with orjson, which is much faster than the stdlib json
+# module httpx would otherwise use, and sent as raw content.
+HEADERS_JSON: dict[str, str] = {"Content-Type": "application/json"}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Validate the configuration and manage the shared Notion client.
+
+    A single asynchronous client, stored as ``app.state.client``, is used for
+    all outgoing calls.  It carries the Authorization and Notion‑Version
+    headers and pools connections; with HTTP/2 enabled the several calls made
+    per upload are multiplexed over one TLS connection to api.notion.com.
+    Using an async client keeps the event loop free while waiting on Notion,
+    so concurrent uploads are not serialised behind one another.  If the
+    configuration is invalid no client is created and the error is kept in
+    ``app.state.config_error``.
+    """
+    app.state.config_error = config_error()
+    app.state.client = None
+    if app.state.config_error is None:
+        app.state.client = httpx.AsyncClient(
+            base_url="https://api.notion.com",
+            http2=True,
+            timeout=30,
+            headers=HEADERS_AUTH,
+        )
+    try:
+        yield
+    finally:
+        if app.state.client is not None:
+            await app.state.client.aclose()
+
+
+app = FastAPI(title="Notion Upload Service", lifespan=lifespan)
+
+
+@app.get("/healthz")
+async def healthz() -> dict:
+    """Report whether the service is configured and ready to upload."""
+    if app.state.client is None:
+        raise HTTPException(status_code=503, detail=app.state.config_error)
+    return {"status": "ok"}
+
+
+# Responses that indicate a transient failure on Notion's side.  A 429 means
+# the request was rejected before being processed, so it is always safe to
+# retry; the 5xx codes are only retried for calls that are safe to repeat.
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+RETRY_ATTEMPTS = 4
+RETRY_MAX_WAIT = 4.0
+_backoff = wait_random_exponential(multiplier=0.2, max=RETRY_MAX_WAIT)
+
+
+def _retry_after(retry_state: RetryCallState) -> float | None:
+    """Return the delay Notion asked for with ``Retry-After``, if any."""
+    outcome = retry_state.outcome
+    if outcome is None or outcome.failed:
+        return None
+    retry_after = outcome.result().headers.get("Retry-After")
+    if retry_after is None:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        return None
+
+
+def _retry_wait(retry_state: RetryCallState) -> float:
+    """Honour Notion's ``Retry-After`` header, else back off with full jitter."""
+    retry_after = _retry_after(retry_state)
+    if retry_after is not None:
+        return retry_after
+    return _backoff(retry_state)
+
+
+class CircuitBreaker:
+    """Fail fast while Notion is persistently failing.
+
+    After ``fail_max`` consecutive failures (5xx responses or transport
+    errors; 4xx responses do not count) the breaker opens and rejects calls
+    for ``reset_timeout`` seconds.  The first call after that is let through
+    as a trial: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, fail_max: int, reset_timeout: float) -> None:
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+
+    def allow(self) -> bool:
+        """Return whether a call may be made now."""
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            # Half-open: let this call through and keep rejecting the others
+            # until it has settled the breaker one way or the other.
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker will next let a call through."""
+        if self._opened_at is None:
+            return 0
+        remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+        return max(1, math.ceil(remaining))
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._failures >= self.fail_max:
+            self._opened_at = time.monotonic()
+
+
+# During a Notion outage every upload would otherwise spend its whole
+# timeout budget on each call.  Once the breaker opens, uploads are refused
+# immediately with a 503 so workers are freed and Notion is not hammered.
+BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30)
+
+# Bulkhead limiting how many uploads are calling Notion concurrently, so a
+# burst of uploads cannot open unbounded connections or trip rate limits.
+NOTION_SEM = asyncio.Semaphore(NOTION_MAX_INFLIGHT)
+
+
+def check_response(response: httpx.Response, action: str) -> None:
+    """Raise an ``HTTPException`` carrying Notion's status if a call failed.
+
+    ``action`` completes the sentence "Failed to ..." in the error detail.
+    Notion's ``Retry-After`` header, if any, is passed on to the client.
+    """
+    if not response.is_success:
+        retry_after = response.headers.get("Retry-After")
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Failed to {action}: {response.text}",
+            headers={"Retry-After": retry_after} if retry_after else None,
+        )
+
+
+async def notion_request(
+    action: str,
+    method: str,
+    url: str,
+    *,
+    idempotent: bool = True,
+    rewind: IO | None = None,
+    deadline: float | None = None,
+    **kwargs,
+) -> httpx.Response:
+    """Send a request through the shared client and return the response.
+
+    Transient failures are retried.  A ``Retry-After`` longer than
+    ``RETRY_MAX_WAIT`` or than the time left before ``deadline`` ends the
+    retries at once.  If the call still fails, an ``HTTPException`` is raised
+    via :func:`check_response` with ``action`` describing the step that
+    failed.
+
+    Notion does not support idempotency keys, so calls that are not safe to
+    repeat (``idempotent=False``) are only retried when Notion cannot have
+    acted on them: a 429 response or a failure to connect.  These are the
+    calls that create pages and file uploads, and the one that sends a file's
+    contents, since a second send to an already uploaded file fails.  Other
+    calls are also retried on 5xx responses and any transport error.
+    ``rewind`` is a file object streamed in the request body, if any; it is
+    seeked back to the start before every attempt.  ``deadline`` is an
+    event-loop time by which the upload must finish; each attempt's timeout
+    is the budget left until then, less ``DEADLINE_MARGIN_S``.  While the
+    circuit breaker is open the call is refused at once with a 503 and a
+    ``Retry-After`` header.
+    """
+    if idempotent:
+        retry = retry_if_exception_type(httpx.TransportError) | retry_if_result(
+            lambda response: response.status_code in RETRYABLE_STATUSES
+        )
+    else:
+        retry = retry_if_exception_type(
+            (httpx.ConnectError, httpx.ConnectTimeout)
+        ) | retry_if_result(lambda response: response.status_code == 429)
+
+    async def send() -> httpx.Response:
+        if deadline is not None:
+            timeout = deadline - asyncio.get_running_loop().time() - DEADLINE_MARGIN_S
+            if timeout <= 0:
+                raise TimeoutError
+            kwargs["timeout"] = timeout
+        if not BREAKER.allow():
+            raise HTTPException(
+                status_code=503,
+                detail="Notion is currently unavailable; try again later.",
+                headers={"Retry-After": str(BREAKER.retry_after())},
+            )
+        if rewind is not None:
+            rewind.seek(0)
+        try:
+            response = await app.state.client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            BREAKER.record_failure()
+            raise
+        if response.status_code >= 500:
+            BREAKER.record_failure()
+        else:
+            BREAKER.record_success()
+        return response
+
+    def retry_after_too_long(retry_state: RetryCallState) -> bool:
+        # Give up rather than call Notion again before it said we may.
+        retry_after = _retry_after(retry_state)
+        if retry_after is None:
+            return False
+        if retry_after > RETRY_MAX_WAIT:
+            return True
+        if deadline is None:
+            return False
+        remaining = deadline - asyncio.get_running_loop().time() - DEADLINE_MARGIN_S
+        return retry_after >= remaining
+
+    retrying = AsyncRetrying(
+        retry=retry,
+        wait=_retry_wait,
+        stop=stop_after_attempt(RETRY_ATTEMPTS) | retry_after_too_long,
+        retry_error_callback=lambda state: state.outcome.result(),
+    )
+    response = await retrying(send)
+    check_response(response, action)
+    return response
 
 
 @app.post("/upload-photo")
@@ -109,8 +379,12 @@ async def upload_photo(
     name: str = Form(..., description="Title of the page (Name property)"),
     date: str = Form(..., description="ISO 8601 date string for the Date property"),
     context: str = Form("", description="Context field (rich text)"),
-    hunger: int = Form(..., description="Hunger level (number)"),
-    energy: int = Form(..., description="Energy level (number)"),
+    hunger: int = Form(
+        ..., ge=JSON_INT_MIN, le=JSON_INT_MAX, description="Hunger level (number)"
+    ),
+    energy: int = Form(
+        ..., ge=JSON_INT_MIN, le=JSON_INT_MAX, description="Energy level (number)"
+    ),
     emotion: str = Form("", description="Emotional state (text)")
 ) -> dict:
     """Create a page in a Notion database and upload a photo.
@@ -123,8 +397,15 @@ async def upload_photo(
 
     Returns the ID of the created page.
     """
-    # 1️⃣ Create the page first, without attaching the file.  This call
-    # defines the values of the database properties.  If you need to add
+    if app.state.client is None:
+        raise HTTPException(status_code=503, detail=app.state.config_error)
+
+    # The file is uploaded before the page is created, and the page is then
+    # created with the image already in its content.  This takes one call
+    # fewer than creating the page and attaching the image afterwards, and a
+    # failed upload no longer leaves an orphaned page in the database.
+    #
+    # These are the page's database property values.  If you need to add
     # additional properties, modify this payload accordingly.
     create_payload = {
         "parent": {"database_id": DATABASE_ID},
@@ -169,92 +450,117 @@ async def upload_photo(
             },
         },
     }
-    page_response = requests.post(
-        "https://api.notion.com/v1/pages",
-        headers=notion_headers({"Content-Type": "application/json"}),
-        json=create_payload,
-        timeout=15,
-    )
-    if page_response.status_code // 100 != 2:
-        raise HTTPException(
-            status_code=page_response.status_code,
-            detail=f"Failed to create Notion page: {page_response.text}",
-        )
-    page_id = page_response.json().get("id")
 
-    # 2️⃣ Create a file upload object.  According to Notion's documentation,
+    # 1️⃣ Create a file upload object.  According to Notion's documentation,
     # you must first call POST /v1/file_uploads to obtain an upload URL and ID
     #【634170527858348†L88-L100】.
     upload_meta_payload = {
         "file_name": file.filename,
         "content_type": file.content_type or "application/octet-stream",
     }
-    upload_meta_response = requests.post(
-        "https://api.notion.com/v1/file_uploads",
-        headers=notion_headers({"Content-Type": "application/json"}),
-        json=upload_meta_payload,
-        timeout=15,
-    )
-    if upload_meta_response.status_code // 100 != 2:
-        raise HTTPException(
-            status_code=upload_meta_response.status_code,
-            detail=f"Failed to create file upload object: {upload_meta_response.text}",
-        )
-    upload_info = upload_meta_response.json()
-    file_upload_id = upload_info["id"]
-    upload_url = upload_info["upload_url"]
-
-    # 3️⃣ Send the binary file contents to Notion.  The /send endpoint
-    # requires a multipart/form‑data POST.  We let the requests library set
-    # Content-Type and boundary automatically【634170527858348†L160-L170】.
-    file_bytes = await file.read()
-    send_response = requests.post(
-        upload_url,
-        headers=notion_headers(),  # Only auth/version; requests sets Content-Type
-        files={
-            "file": (file.filename, file_bytes, file.content_type or "application/octet-stream")
-        },
-        timeout=30,
-    )
-    if send_response.status_code // 100 != 2:
+
+    # Wait only briefly for a slot in the bulkhead; if Notion is slow enough
+    # that every slot is taken, turn the upload away instead of queueing it.
+    try:
+        await asyncio.wait_for(NOTION_SEM.acquire(), timeout=NOTION_QUEUE_TIMEOUT_S)
+    except TimeoutError:
         raise HTTPException(
-            status_code=send_response.status_code,
-            detail=f"Failed to upload file contents: {send_response.text}",
+            status_code=503,
+            detail="Too many uploads in progress; try again later.",
+            headers={"Retry-After": "1"},
         )
 
-    # 4️⃣ Attach the uploaded file to the newly created page.  Once the file
-    # status is 'uploaded', you can include it as a file_upload object in a
-    # block or property【634170527858348†L278-L295】.  Here we append an image
-    # block to the page so the picture appears in the page content.
-    attach_payload = {
-        "children": [
-            {
-                "object": "block",
-                "type": "image",
-                "image": {
-                    "type": "file_upload",
-                    "file_upload": {
-                        "id": file_upload_id
+    # Bound the whole Notion exchange by one deadline rather than a timeout
+    # per call, so the worst case does not grow with the number of calls.
+    # Each call is given whatever budget remains.
+    deadline = asyncio.get_running_loop().time() + UPLOAD_DEADLINE_S
+    try:
+        async with asyncio.timeout_at(deadline):
+            upload_meta_response = await notion_request(
+                "create file upload object",
+                "POST",
+                "/v1/file_uploads",
+                idempotent=False,
+                deadline=deadline,
+                content=orjson.dumps(upload_meta_payload),
+                headers=HEADERS_JSON,
+            )
+            upload_info = upload_meta_response.json()
+            file_upload_id = upload_info["id"]
+            upload_url = upload_info["upload_url"]
+
+            # 2️⃣ Send the binary file contents to Notion.  The /send endpoint
+            # requires a multipart/form‑data POST.  We let httpx set
+            # Content-Type and boundary automatically【634170527858348†L160-L170】.
+            #
+            # Starlette keeps uploads under 1 MB in memory and spools larger
+            # ones to a temporary file.  An in-memory upload is sent as bytes:
+            # handing httpx the file object would make it call fileno() to
+            # work out Content-Length, forcing the spool onto disk.  An upload
+            # already on disk is passed as the file object, which httpx reads
+            # in 64 KB chunks so a large photo is never held in memory in
+            # full.  Starlette makes the same ``_rolled`` check.
+            if getattr(file.file, "_rolled", True):
+                content = rewind = file.file
+            else:
+                await file.seek(0)
+                content, rewind = await file.read(), None
+            await notion_request(
+                "upload file contents",
+                "POST",
+                upload_url,
+                idempotent=False,
+                rewind=rewind,
+                deadline=deadline,
+                files={
+                    "file": (file.filename, content, file.content_type or "application/octet-stream")
+                },
+            )
+
+            # 3️⃣ Create the page with the uploaded file attached.  Once the
+            # file status is 'uploaded', you can include it as a file_upload
+            # object in a block or property【634170527858348†L278-L295】.  Here we
+            # add an image block to the page's children so the picture appears
+            # in the page content.
+            create_payload["children"] = [
+                {
+                    "object": "block",
+                    "type": "image",
+                    "image": {
+                        "type": "file_upload",
+                        "file_upload": {
+                            "id": file_upload_id
+                        }
                     }
                 }
-            }
-        ]
-    }
-    attach_response = requests.patch(
-        f"https://api.notion.com/v1/blocks/{page_id}/children",
-        headers=notion_headers({"Content-Type": "application/json"}),
-        json=attach_payload,
-        timeout=15,
-    )
-    if attach_response.status_code // 100 != 2:
+            ]
+            page_response = await notion_request(
+                "create Notion page",
+                "POST",
+                "/v1/pages",
+                idempotent=False,
+                deadline=deadline,
+                content=orjson.dumps(create_payload),
+                headers=HEADERS_JSON,
+            )
+            page_id = page_response.json().get("id")
+    except (TimeoutError, httpx.TimeoutException):
+        raise HTTPException(
+            status_code=504,
+            detail="Timed out waiting for Notion.",
+        )
+    except httpx.TransportError as exc:
+        # Connection failures that outlasted the retries.
         raise HTTPException(
-            status_code=attach_response.status_code,
-            detail=f"Failed to attach file to page: {attach_response.text}",
+            status_code=502,
+            detail=f"Could not reach Notion: {exc!r}",
         )
+    finally:
+        NOTION_SEM.release()
 
     # You can alternatively attach the file to a Files property instead of
-    # creating an image block.  To do so, send a PATCH to
-    # `/v1/pages/{page_id}` with a property value like:
+    # creating an image block.  To do so, leave out ``children`` and add a
+    # property value like this to ``create_payload["properties"]``:
     #
     #     {
     #         "Photo": {
@@ -0,0 +1,293 @@
+"""Tests for the resilience behaviour of the upload service.
+
+Notion is replaced by an ``httpx.MockTransport`` (or, for hangs, a local
+socket that never answers) installed as the app's shared client.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+
+os.environ.setdefault("NOTION_TOKEN", "secret_test")
+os.environ.setdefault("NOTION_DATABASE_ID", "0" * 32)
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+FORM = {
+    "name": "Lunch",
+    "date": "2025-01-01",
+    "hunger": "3",
+    "energy": "4",
+}
+
+
+def upload(client: TestClient):
+    return client.post(
+        "/upload-photo",
+        data=FORM,
+        files={"file": ("photo.jpg", b"jpeg-bytes", "image/jpeg")},
+    )
+
+
+def notion_ok(request: httpx.Request) -> httpx.Response:
+    """Answer the three calls of a successful upload."""
+    if request.url.path == "/v1/file_uploads":
+        return httpx.Response(
+            200,
+            json={
+                "id": "fu_1",
+                "upload_url": "https://api.notion.com/v1/file_uploads/fu_1/send",
+            },
+        )
+    if request.url.path == "/v1/file_uploads/fu_1/send":
+        return httpx.Response(200, json={"status": "uploaded"})
+    if (request.method, request.url.path) == ("POST", "/v1/pages"):
+        return httpx.Response(200, json={"id": "page_1"})
+    return httpx.Response(404, json={"message": "unexpected call"})
+
+
+class FakeNotion:
+    """Stand-in for Notion: records every request and answers via ``handler``."""
+
+    def __init__(self) -> None:
+        self.handler = notion_ok
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+
+@pytest.fixture
+def notion() -> FakeNotion:
+    return FakeNotion()
+
+
+@pytest.fixture
+def client(monkeypatch, notion):
+    """A test client whose Notion calls are answered by ``notion``.
+
+    The lifespan's own client is put back before shutdown so the lifespan
+    closes it, and the mock client is closed here.
+    """
+    monkeypatch.setattr(main, "BREAKER", main.CircuitBreaker(fail_max=3, reset_timeout=0.2))
+    with TestClient(main.app) as test_client:
+        lifespan_client = main.app.state.client
+        mock_client = httpx.AsyncClient(
+            base_url="https://api.notion.com",
+            transport=httpx.MockTransport(notion),
+        )
+        main.app.state.client = mock_client
+        try:
+            yield test_client
+        finally:
+            main.app.state.client = lifespan_client
+            test_client.portal.call(mock_client.aclose)
+
+
+def test_upload_sends_file_then_creates_page_with_image(client, notion):
+    assert upload(client).json() == {"page_id": "page_1"}
+
+    assert [(r.method, r.url.path) for r in notion.requests] == [
+        ("POST", "/v1/file_uploads"),
+        ("POST", "/v1/file_uploads/fu_1/send"),
+        ("POST", "/v1/pages"),
+    ]
+    page = json.loads(notion.requests[2].content)
+    assert page["parent"] == {"database_id": main.DATABASE_ID}
+    assert page["properties"]["Name"]["title"][0]["text"]["content"] == "Lunch"
+    assert page["properties"]["Hunger_level"] == {"number": 3}
+    assert page["children"] == [
+        {
+            "object": "block",
+            "type": "image",
+            "image": {"type": "file_upload", "file_upload": {"id": "fu_1"}},
+        }
+    ]
+
+
+def test_failed_file_send_creates_no_page(client, notion):
+    def handler(request):
+        if request.url.path.endswith("/send"):
+            return httpx.Response(500, json={"message": "upload failed"})
+        return notion_ok(request)
+
+    notion.handler = handler
+    response = upload(client)
+    assert response.status_code == 500
+    assert "upload file contents" in response.json()["detail"]
+    assert [r.url.path for r in notion.requests] == [
+        "/v1/file_uploads",
+        "/v1/file_uploads/fu_1/send",
+    ]
+
+
+def test_hung_notion_opens_breaker(client, monkeypatch):
+    # A listening socket that never accepts: connections succeed but no
+    # response ever arrives.
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(16)
+    mock_client = main.app.state.client
+    hung_client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{server.getsockname()[1]}")
+    main.app.state.client = hung_client
+    try:
+        monkeypatch.setattr(main, "UPLOAD_DEADLINE_S", 0.5)
+
+        for _ in range(main.BREAKER.fail_max):
+            assert upload(client).status_code == 504
+
+        response = upload(client)
+        assert response.status_code == 503
+        assert "Retry-After" in response.headers
+    finally:
+        main.app.state.client = mock_client
+        client.portal.call(hung_client.aclose)
+        server.close()
+
+
+def test_breaker_opens_then_lets_one_trial_through(client, notion):
+    notion.handler = lambda request: httpx.Response(500, json={"message": "down"})
+    for _ in range(main.BREAKER.fail_max):
+        assert upload(client).status_code == 500
+
+    # Open: refused without reaching Notion.
+    response = upload(client)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert len(notion.requests) == main.BREAKER.fail_max
+
+    # Half-open: the trial call fails, so the breaker opens again.
+    time.sleep(main.BREAKER.reset_timeout)
+    assert upload(client).status_code == 500
+    assert upload(client).status_code == 503
+    assert len(notion.requests) == main.BREAKER.fail_max + 1
+
+    # Half-open again: a successful trial closes the breaker.
+    time.sleep(main.BREAKER.reset_timeout)
+    notion.handler = notion_ok
+    assert upload(client).json() == {"page_id": "page_1"}
+    assert upload(client).json() == {"page_id": "page_1"}
+
+
+def test_full_bulkhead_refuses_upload(client, notion, monkeypatch):
+    # Every slot is taken by an upload that never finishes.
+    monkeypatch.setattr(main, "NOTION_SEM", asyncio.Semaphore(0))
+    monkeypatch.setattr(main, "NOTION_QUEUE_TIMEOUT_S", 0.05)
+
+    response = upload(client)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert notion.requests == []
+
+
+def test_retry_after_is_honoured(client, notion, monkeypatch):
+    monkeypatch.setattr(main, "_backoff", lambda retry_state: 0)
+    sent_at = []
+
+    def handler(request):
+        sent_at.append(time.monotonic())
+        if len(sent_at) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.3"})
+        return notion_ok(request)
+
+    notion.handler = handler
+    assert upload(client).json() == {"page_id": "page_1"}
+    assert sent_at[1] - sent_at[0] >= 0.3
+
+
+def test_long_retry_after_is_passed_to_the_client(client, notion):
+    notion.handler = lambda request: httpx.Response(429, headers={"Retry-After": "30"})
+
+    started = time.monotonic()
+    response = upload(client)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+    assert len(notion.requests) == 1
+    assert time.monotonic() - started < 1
+
+
+def test_unreachable_notion_is_a_bad_gateway(client, notion, monkeypatch):
+    monkeypatch.setattr(main, "_backoff", lambda retry_state: 0)
+    # Keep the breaker closed so the exhausted retries are what ends the call.
+    monkeypatch.setattr(main, "BREAKER", main.CircuitBreaker(fail_max=100, reset_timeout=30))
+
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    notion.handler = handler
+    assert upload(client).status_code == 502
+
+
+def test_out_of_range_number_is_rejected_before_upload(client, notion):
+    response = client.post(
+        "/upload-photo",
+        data={**FORM, "hunger": str(2**64)},
+        files={"file": ("photo.jpg", b"jpeg-bytes", "image/jpeg")},
+    )
+    assert response.status_code == 422
+    assert notion.requests == []
+
+
+def test_file_send_is_not_retried_after_a_read_timeout(client, notion):
+    def handler(request):
+        if request.url.path.endswith("/send"):
+            raise httpx.ReadTimeout("no response", request=request)
+        return notion_ok(request)
+
+    notion.handler = handler
+    assert upload(client).status_code == 504
+    assert [r.url.path for r in notion.requests] == [
+        "/v1/file_uploads",
+        "/v1/file_uploads/fu_1/send",
+    ]
+
+
+@pytest.mark.parametrize("size", [1000, 2 * 1024 * 1024])
+def test_photo_is_sent_in_full_and_small_ones_stay_in_memory(client, notion, monkeypatch, size):
+    rolled = []
+    rollover = tempfile.SpooledTemporaryFile.rollover
+
+    def recording_rollover(self):
+        rolled.append(self)
+        rollover(self)
+
+    monkeypatch.setattr(tempfile.SpooledTemporaryFile, "rollover", recording_rollover)
+    photo = os.urandom(size)
+
+    response = client.post(
+        "/upload-photo",
+        data=FORM,
+        files={"file": ("photo.jpg", photo, "image/jpeg")},
+    )
+    assert response.json() == {"page_id": "page_1"}
+    send = notion.requests[1]
+    assert send.url.path == "/v1/file_uploads/fu_1/send"
+    assert photo in send.content
+    # Only uploads beyond Starlette's 1 MB spool limit touch the disk.
+    assert bool(rolled) == (size > 1024 * 1024)
+
+
+def test_healthz_ok_when_configured(client):
+    response = client.get("/healthz")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+def test_missing_token_is_reported_with_503(monkeypatch):
+    monkeypatch.setattr(main, "NOTION_TOKEN", "")
+    with TestClient(main.app) as unconfigured:
+        health = unconfigured.get("/healthz")
+        assert health.status_code == 503
+        assert health.json() == {"detail": main.config_error()}
+
+        response = upload(unconfigured)
+        assert response.status_code == 503
+        assert response.json() == {"detail": main.config_error()}